@@ -3,11 +3,20 @@ Excel Exporter Module
 Exports extracted image features to Excel files.
 """
 
+import numpy as np
+import operator
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill
-from typing import List, Dict, Any
+from openpyxl.utils import get_column_letter
+from typing import List, Dict, Any, Iterable
 import os
 
+try:
+    import xlsxwriter
+except ImportError:  # optional: fall back to openpyxl for every export
+    xlsxwriter = None
+
 
 class ExcelExporter:
     """Export image features to Excel format."""
@@ -16,41 +25,135 @@ class ExcelExporter:
         """Initialize the Excel exporter."""
         self.workbook = None
         self.worksheet = None
+        self._backend = 'xlsxwriter' if xlsxwriter else 'openpyxl'
     
     def create_workbook(self):
-        """Create a new Excel workbook."""
-        self.workbook = Workbook()
-        self.worksheet = self.workbook.active
-        self.worksheet.title = "Image Features"
+        """Create a new streaming (write-only) Excel workbook."""
+        self.workbook = Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet("Image Features")
     
-    def style_header(self):
-        """Apply styling to the header row."""
+    def style_header(self, headers: List[Any]) -> List[WriteOnlyCell]:
+        """
+        Build a styled header row for the current worksheet.
+        
+        Args:
+            headers: Header values
+            
+        Returns:
+            List of styled cells ready to be appended
+        """
         header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF", size=11)
         header_alignment = Alignment(horizontal="center", vertical="center")
         
-        for cell in self.worksheet[1]:
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(self.worksheet, value=header)
             cell.fill = header_fill
             cell.font = header_font
             cell.alignment = header_alignment
+            cells.append(cell)
+        return cells
     
-    def auto_adjust_column_width(self):
-        """Automatically adjust column widths based on content."""
-        for column in self.worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
+    @staticmethod
+    def _collect_headers(features_list: List[Dict[str, Any]]) -> List[str]:
+        """
+        Collect the feature keys of all dictionaries in first-seen order.
+        
+        Args:
+            features_list: List of dictionaries containing extracted features
             
-            for cell in column:
-                try:
-                    if cell.value:
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                except (TypeError, AttributeError):
-                    pass
+        Returns:
+            Unique keys, ordered as they first appear
+        """
+        return list(dict.fromkeys(key for features in features_list for key in features))
+    
+    @staticmethod
+    def _feature_rows(features_list: List[Dict[str, Any]], headers: List[str]) -> Iterable[tuple]:
+        """
+        Build one row per feature dictionary, with values in header order.
+        
+        When every dictionary has the full set of keys (the usual case, as
+        each image yields the same features), rows are built with a single
+        operator.itemgetter; otherwise missing values are filled with "".
+        
+        Args:
+            features_list: List of dictionaries containing extracted features
+            headers: Column keys
             
-            adjusted_width = min(max_length + 2, 50)  # Max width of 50
-            self.worksheet.column_dimensions[column_letter].width = adjusted_width
+        Returns:
+            Iterable of row tuples
+        """
+        if all(len(features) == len(headers) for features in features_list):
+            get_row = operator.itemgetter(*headers)
+            if len(headers) == 1:
+                return ((get_row(features),) for features in features_list)
+            return map(get_row, features_list)
+        return (tuple(features.get(key, "") for key in headers) for features in features_list)
+    
+    @staticmethod
+    def _update_widths(row: List[Any], widths: List[int]):
+        """
+        Grow the running column widths to fit a row's values.
+        
+        Args:
+            row: Row values
+            widths: Running maximum text length per column, updated in place
+        """
+        for i, value in enumerate(row):
+            if value:
+                length = len(str(value))
+                if length > widths[i]:
+                    widths[i] = length
+    
+    def auto_adjust_column_width(self, widths: List[int]):
+        """
+        Set column widths from the longest value seen in each column.
+        
+        Write-only worksheets emit their column settings with the first row,
+        so this must be called before anything is appended.
+        
+        Args:
+            widths: Maximum text length per column
+        """
+        for i, width in enumerate(widths):
+            adjusted_width = min(width + 2, 50)  # Max width of 50
+            self.worksheet.column_dimensions[get_column_letter(i + 1)].width = adjusted_width
+    
+    def measure_widths(self, headers: List[Any], rows: Iterable[List[Any]]) -> List[int]:
+        """
+        Measure the longest value in each column.
+        
+        Args:
+            headers: Header values
+            rows: Data rows
+            
+        Returns:
+            Maximum text length per column
+        """
+        widths = [0] * len(headers)
+        self._update_widths(headers, widths)
+        for row in rows:
+            self._update_widths(row, widths)
+        return widths
+    
+    def write_rows(self, headers: List[Any], rows: Iterable[List[Any]], widths: List[int]):
+        """
+        Write a styled header and data rows to the current worksheet.
+        
+        Write-only worksheets need their column widths before the first row,
+        so widths are measured by the caller (see measure_widths) and the
+        rows are then streamed straight to the worksheet.
+        
+        Args:
+            headers: Header values
+            rows: Data rows
+            widths: Maximum text length per column
+        """
+        self.auto_adjust_column_width(widths)
+        self.worksheet.append(self.style_header(headers))
+        for row in rows:
+            self.worksheet.append(row)
     
     def export_single_image(self, features: Dict[str, Any], output_path: str):
         """
@@ -63,13 +166,9 @@ class ExcelExporter:
         self.create_workbook()
         
         # Write headers and values
-        self.worksheet.append(["Feature", "Value"])
-        
-        for key, value in features.items():
-            self.worksheet.append([key, value])
-        
-        self.style_header()
-        self.auto_adjust_column_width()
+        headers = ["Feature", "Value"]
+        rows = [[key, value] for key, value in features.items()]
+        self.write_rows(headers, rows, self.measure_widths(headers, rows))
         
         # Save the workbook
         self.workbook.save(output_path)
@@ -86,29 +185,57 @@ class ExcelExporter:
         if not features_list:
             raise ValueError("No features to export")
         
-        self.create_workbook()
+        # Get all unique keys from all feature dictionaries, in first-seen order
+        headers = self._collect_headers(features_list)
         
-        # Get all unique keys from all feature dictionaries
-        all_keys = set()
-        for features in features_list:
-            all_keys.update(features.keys())
+        # Write headers and data rows
+        if self._backend == 'xlsxwriter':
+            self._export_rows_xlsxwriter(headers, self._feature_rows(features_list, headers), output_path)
+        else:
+            self.create_workbook()
+            
+            # Measure widths in one pass, then stream the rows in a second
+            widths = self.measure_widths(headers, self._feature_rows(features_list, headers))
+            self.write_rows(headers, self._feature_rows(features_list, headers), widths)
+            
+            # Save the workbook
+            self.workbook.save(output_path)
+        print(f"Excel file saved successfully: {output_path}")
+    
+    def _export_rows_xlsxwriter(self, headers: List[Any], rows: Iterable[List[Any]], output_path: str):
+        """
+        Write a single "Image Features" sheet with xlsxwriter.
         
-        headers = sorted(list(all_keys))
+        Uses constant_memory mode, which flushes each row to disk as soon as
+        it is written, so memory use does not grow with the number of rows.
         
-        # Write headers
-        self.worksheet.append(headers)
+        Args:
+            headers: Header values
+            rows: Data rows
+            output_path: Path where the Excel file will be saved
+        """
+        # strings_to_urls is off so OCR text is written verbatim, as openpyxl does
+        workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True, 'strings_to_urls': False})
+        worksheet = workbook.add_worksheet("Image Features")
+        header_format = workbook.add_format({
+            'bold': True, 'font_color': '#FFFFFF', 'font_size': 11,
+            'bg_color': '#4472C4', 'align': 'center', 'valign': 'vcenter',
+        })
         
-        # Write data rows
-        for features in features_list:
-            row = [features.get(key, "") for key in headers]
-            self.worksheet.append(row)
+        worksheet.write_row(0, 0, headers, header_format)
+        widths = [0] * len(headers)
+        self._update_widths(headers, widths)
+        for row_index, row in enumerate(rows, 1):
+            worksheet.write_row(row_index, 0, row)
+            self._update_widths(row, widths)
         
-        self.style_header()
-        self.auto_adjust_column_width()
+        for i, width in enumerate(widths):
+            worksheet.set_column(i, i, min(width + 2, 50))  # Max width of 50
         
-        # Save the workbook
-        self.workbook.save(output_path)
-        print(f"Excel file saved successfully: {output_path}")
+        try:
+            workbook.close()
+        except xlsxwriter.exceptions.FileCreateError as e:
+            raise OSError(f"Could not save {output_path}: {e}") from e
     
     def export_with_summary(self, features_list: List[Dict[str, Any]], output_path: str):
         """
@@ -121,49 +248,36 @@ class ExcelExporter:
         if not features_list:
             raise ValueError("No features to export")
         
-        self.workbook = Workbook()
+        self.workbook = Workbook(write_only=True)
         
         # Create data sheet
-        data_sheet = self.workbook.active
-        data_sheet.title = "Image Data"
-        
-        # Get all unique keys
-        all_keys = set()
-        for features in features_list:
-            all_keys.update(features.keys())
-        headers = sorted(list(all_keys))
-        
-        # Write headers and data
-        data_sheet.append(headers)
-        for features in features_list:
-            row = [features.get(key, "") for key in headers]
-            data_sheet.append(row)
-        
-        # Style data sheet
-        self.worksheet = data_sheet
-        self.style_header()
-        self.auto_adjust_column_width()
+        self.worksheet = self.workbook.create_sheet("Image Data")
+        
+        # Get all unique keys, in first-seen order
+        headers = self._collect_headers(features_list)
+        
+        # Write headers and data, measuring widths before streaming the rows
+        widths = self.measure_widths(headers, self._feature_rows(features_list, headers))
+        self.write_rows(headers, self._feature_rows(features_list, headers), widths)
         
         # Create summary sheet
-        summary_sheet = self.workbook.create_sheet("Summary", 0)
-        summary_sheet.append(["Summary", ""])
-        summary_sheet.append(["Total Images Processed", len(features_list)])
+        self.worksheet = self.workbook.create_sheet("Summary", 0)
+        summary_rows = [["Total Images Processed", len(features_list)]]
+        
+        # Calculate some statistics in a single pass over the features
+        values = np.array([[f.get('avg_brightness', 0), f.get('width', 0), f.get('height', 0)]
+                           for f in features_list], dtype=np.float64)
+        avg_brightness, avg_width, avg_height = values.mean(axis=0).tolist()
         
-        # Calculate some statistics
         if 'avg_brightness' in headers:
-            avg_brightness = sum(f.get('avg_brightness', 0) for f in features_list) / len(features_list)
-            summary_sheet.append(["Average Brightness", round(avg_brightness, 2)])
+            summary_rows.append(["Average Brightness", round(avg_brightness, 2)])
         
         if 'width' in headers and 'height' in headers:
-            avg_width = sum(f.get('width', 0) for f in features_list) / len(features_list)
-            avg_height = sum(f.get('height', 0) for f in features_list) / len(features_list)
-            summary_sheet.append(["Average Width", round(avg_width, 2)])
-            summary_sheet.append(["Average Height", round(avg_height, 2)])
-        
-        # Style summary sheet
-        self.worksheet = summary_sheet
-        self.style_header()
-        self.auto_adjust_column_width()
+            summary_rows.append(["Average Width", round(avg_width, 2)])
+            summary_rows.append(["Average Height", round(avg_height, 2)])
+        
+        summary_headers = ["Summary", ""]
+        self.write_rows(summary_headers, summary_rows, self.measure_widths(summary_headers, summary_rows))
         
         # Save the workbook
         self.workbook.save(output_path)
@@ -4,19 +4,139 @@ Extracts features and text from images using OCR and computer vision techniques.
 """
 
 import cv2
+import mmap
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import os
 from PIL import Image
 import pytesseract
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional, Union
+
+try:
+    import tesserocr
+except ImportError:  # optional: fall back to the pytesseract subprocess
+    tesserocr = None
+
+try:
+    from sklearn.cluster import MiniBatchKMeans
+except ImportError:  # optional: fall back to cv2.kmeans on the pixel sample
+    MiniBatchKMeans = None
+
+# Number of pixels sampled for k-means color clustering
+_KMEANS_SAMPLE_SIZE = 20000
+
+# Shared pool that runs OCR alongside the OpenCV feature extraction,
+# created lazily per process (see _ocr_pool)
+_tpool = None
+_tpool_pid = None
+
+
+def _ocr_pool() -> ThreadPoolExecutor:
+    """
+    Return this process's OCR thread pool, creating it on first use.
+    
+    A forked child inherits the parent's pool object but none of its
+    threads, so submitting to it would never run; the pool is therefore
+    recreated whenever the process id changes.
+    """
+    global _tpool, _tpool_pid
+    if _tpool is None or _tpool_pid != os.getpid():
+        _tpool = ThreadPoolExecutor(max_workers=2)
+        _tpool_pid = os.getpid()
+    return _tpool
+
+
+def _maybe_downscale(image: np.ndarray, max_side: Optional[int] = 512) -> np.ndarray:
+    """
+    Shrink an image so its longest side is at most max_side pixels.
+    
+    Uses nearest-neighbour sampling so every output pixel is a color that
+    occurs in the original; area interpolation would blend neighbours into
+    new colors. Images that are already small enough (or a max_side of
+    None) are returned unchanged.
+    """
+    if not max_side:
+        return image
+    scale = max_side / max(image.shape[:2])
+    if scale >= 1:
+        return image
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+
+
+# Prefix of the extracted_text value when OCR fails
+_OCR_ERROR_PREFIX = "Error extracting text: "
+
+# LRU cache of features dictionaries, keyed on
+# (absolute path, mtime_ns, size, max_side). Only the small dictionaries
+# are kept, never pixel data, so a modified file simply misses the cache.
+_FEATURE_CACHE_SIZE = 256
+_feature_cache = OrderedDict()
+_feature_cache_lock = threading.Lock()
+
+
+def _cache_get(key: tuple) -> Optional[Dict[str, Any]]:
+    """Return the cached features for key, or None on a miss."""
+    with _feature_cache_lock:
+        features = _feature_cache.get(key)
+        if features is not None:
+            _feature_cache.move_to_end(key)
+        return features
+
+
+def _cache_put(key: tuple, features: Dict[str, Any]):
+    """Store features for key, evicting the least recently used entry."""
+    with _feature_cache_lock:
+        _feature_cache[key] = features
+        _feature_cache.move_to_end(key)
+        if len(_feature_cache) > _FEATURE_CACHE_SIZE:
+            _feature_cache.popitem(last=False)
 
 
 class ImageProcessor:
     """Process images and extract features for Excel export."""
     
-    def __init__(self):
-        """Initialize the image processor."""
-        pass
+    def __init__(self, max_side: Optional[int] = 512):
+        """
+        Initialize the image processor.
+        
+        Args:
+            max_side: Longest side, in pixels, that images are subsampled to
+                before computing dominant colors
+                (None to always use full resolution)
+        """
+        self.max_side = max_side
+        self._tess = None
+    
+    def __enter__(self) -> 'ImageProcessor':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Release the persistent OCR engine, if one was started."""
+        if self._tess:
+            self._tess.End()
+        self._tess = None
+    
+    def _get_tess(self):
+        """
+        Return a persistent tesserocr engine, creating it on first use.
+        
+        Returns:
+            A tesserocr.PyTessBaseAPI instance, or None when tesserocr is
+            not installed or could not be initialized
+        """
+        if self._tess is None:
+            self._tess = False
+            if tesserocr is not None:
+                try:
+                    self._tess = tesserocr.PyTessBaseAPI()
+                except RuntimeError:
+                    pass
+        return self._tess or None
     
     def load_image(self, image_path: str) -> np.ndarray:
         """
@@ -28,45 +148,128 @@ class ImageProcessor:
         Returns:
             Loaded image as numpy array
         """
-        image = cv2.imread(image_path)
+        # Decode straight from a memory map of the file to avoid copying
+        # its bytes through an intermediate read buffer
+        with open(image_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Could not load image from {image_path}")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                image = cv2.imdecode(np.frombuffer(mm, dtype=np.uint8), cv2.IMREAD_COLOR)
         if image is None:
             raise ValueError(f"Could not load image from {image_path}")
         return image
     
-    def extract_text(self, image_path: str) -> str:
+    def extract_text(self, image: Union[str, np.ndarray]) -> str:
         """
         Extract text from image using OCR (Optical Character Recognition).
         
+        When tesserocr is installed a single Tesseract engine is kept open
+        and reused across calls, and decoded images are handed to it as raw
+        pixels; otherwise pytesseract is used.
+        
+        Images opened from a path that have an alpha channel are composited
+        onto white first, so dark text on a transparent background stays
+        readable.
+        
         Args:
-            image_path: Path to the image file
+            image: Path to the image file or an already decoded BGR image
             
         Returns:
             Extracted text as string
         """
         try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
+            if isinstance(image, np.ndarray):
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            else:
+                image = Image.open(image)
+                if 'A' in image.getbands():
+                    background = Image.new('RGB', image.size, (255, 255, 255))
+                    background.paste(image, (0, 0), image.getchannel('A'))
+                    image = background
+            tess = self._get_tess()
+            if tess is not None:
+                # Reuse the loaded engine instead of spawning tesseract
+                if isinstance(image, np.ndarray):
+                    height, width = image.shape[:2]
+                    tess.SetImageBytes(image.tobytes(), width, height, 3, 3 * width)
+                else:
+                    tess.SetImage(image)
+                text = tess.GetUTF8Text()
+            else:
+                text = pytesseract.image_to_string(image)
             return text.strip()
-        except (IOError, OSError, pytesseract.TesseractError) as e:
-            return f"Error extracting text: {str(e)}"
+        except (IOError, OSError, RuntimeError, pytesseract.TesseractError) as e:
+            return f"{_OCR_ERROR_PREFIX}{str(e)}"
     
-    def get_image_properties(self, image_path: str) -> Dict[str, Any]:
+    def _has_alpha(self, image_path: str) -> bool:
         """
-        Get basic properties of an image.
+        Check whether an image file has an alpha channel.
+        
+        Only the file header is read.
         
         Args:
             image_path: Path to the image file
             
+        Returns:
+            True if the image has an alpha channel, False otherwise
+        """
+        try:
+            with Image.open(image_path) as image:
+                return 'A' in image.getbands()
+        except (IOError, OSError):
+            return False
+    
+    def _as_image(self, image: Union[str, np.ndarray]) -> np.ndarray:
+        """
+        Return a decoded image, loading it from disk if a path is given.
+        
+        Args:
+            image: Path to the image file or an already decoded image
+            
+        Returns:
+            Image as numpy array
+        """
+        if isinstance(image, np.ndarray):
+            return image
+        return self.load_image(image)
+    
+    def _as_gray(self, image: Union[str, np.ndarray]) -> np.ndarray:
+        """
+        Return a grayscale image, converting or loading it as needed.
+        
+        Args:
+            image: Path to the image file, a decoded BGR image, or an already
+                grayscale image
+            
+        Returns:
+            Grayscale image as numpy array
+        """
+        image = self._as_image(image)
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    def get_image_properties(self, image: Union[str, np.ndarray],
+                             file_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get basic properties of an image.
+        
+        Args:
+            image: Path to the image file or an already decoded image
+            file_size: Size of the image file in bytes (looked up from the
+                path when not given)
+            
         Returns:
             Dictionary containing image properties
         """
-        image = self.load_image(image_path)
+        if file_size is None:
+            if not isinstance(image, str):
+                raise ValueError("file_size is required when passing a decoded image")
+            file_size = os.stat(image).st_size
+        image = self._as_image(image)
         height, width = image.shape[:2]
         channels = image.shape[2] if len(image.shape) > 2 else 1
         
-        # Calculate file size
-        file_size = os.path.getsize(image_path)
-        
         return {
             'width': width,
             'height': height,
@@ -76,68 +279,165 @@ class ImageProcessor:
             'total_pixels': width * height
         }
     
-    def detect_dominant_colors(self, image_path: str, n_colors: int = 5) -> List[Tuple[int, int, int]]:
+    def detect_dominant_colors(self, image: Union[str, np.ndarray], n_colors: int = 5,
+                               method: str = 'histogram') -> List[Tuple[int, int, int]]:
         """
-        Detect dominant colors in the image using K-means clustering.
+        Detect dominant colors in the image.
+        
+        The default 'histogram' method reduces each channel to 5 bits
+        (32 levels), counts the pixels into 32768 bins, and returns the mean
+        color of the most populated bins.
+        The 'kmeans' method clusters a random sample of pixels instead.
         
         Args:
-            image_path: Path to the image file
+            image: Path to the image file or an already decoded BGR image
             n_colors: Number of dominant colors to detect
+            method: Either 'histogram' or 'kmeans'
             
         Returns:
-            List of RGB tuples representing dominant colors
+            List of RGB tuples representing dominant colors, most common first
         """
-        image = self.load_image(image_path)
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        if method not in ('histogram', 'kmeans'):
+            raise ValueError(f"Unknown dominant color method: {method}")
+        
+        # Subsample without blending and stay in BGR uint8; channels are
+        # reordered only where needed
+        image = _maybe_downscale(self._as_image(image), self.max_side)
+        
+        if method == 'kmeans':
+            return self._kmeans_colors(image, n_colors)
         
-        # Reshape image to be a list of pixels
+        # Quantize each contiguous uint8 channel plane to 5 bits, then pack
+        # them into one 15-bit bin index per pixel
+        blue, green, red = cv2.split(image)
+        idx = ((red >> 3).astype(np.uint16) << 10) | ((green >> 3).astype(np.uint16) << 5) | (blue >> 3)
+        idx = idx.ravel()
+        counts = np.bincount(idx, minlength=1 << 15)
+        
+        # Take the most populated bins, ordered by count
+        top = np.argpartition(counts, -n_colors)[-n_colors:]
+        top = top[np.argsort(counts[top])[::-1]]
+        
+        # With fewer occupied bins than n_colors, repeat the most common
+        # color rather than reporting empty bins as colors
+        top = np.where(counts[top] > 0, top, top[0])
+        
+        # Report the mean color of the pixels in each bin, so solid colors
+        # come back exactly
+        colors = np.stack([
+            np.bincount(idx, weights=channel.ravel(), minlength=1 << 15)[top] / counts[top]
+            for channel in (red, green, blue)
+        ], axis=1)
+        colors = np.rint(colors).astype(np.uint8)
+        
+        return [tuple(int(c) for c in color) for color in colors]
+    
+    def _kmeans_colors(self, image: np.ndarray, n_colors: int) -> List[Tuple[int, int, int]]:
+        """
+        Cluster a random sample of pixels into dominant colors with K-means.
+        
+        Uses scikit-learn's MiniBatchKMeans when installed, otherwise a
+        single-attempt cv2.kmeans on the same sample.
+        
+        Only the sample is converted to float32; the image itself stays uint8.
+        
+        Args:
+            image: BGR image
+            n_colors: Number of clusters
+            
+        Returns:
+            List of RGB tuples for the cluster centers, largest cluster first
+        """
         pixels = image.reshape(-1, 3)
-        pixels = np.float32(pixels)
+        rng = np.random.default_rng(0)
+        sample_size = min(_KMEANS_SAMPLE_SIZE, len(pixels))
+        sample = pixels[rng.integers(0, len(pixels), sample_size), ::-1].astype(np.float32)
         
-        # Apply K-means clustering
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 100, 0.2)
-        _, labels, centers = cv2.kmeans(pixels, n_colors, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
+        if MiniBatchKMeans is not None:
+            kmeans = MiniBatchKMeans(n_clusters=n_colors, n_init=1, batch_size=1024,
+                                     random_state=0).fit(sample)
+            labels, centers = kmeans.labels_, kmeans.cluster_centers_
+        else:
+            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 100, 0.2)
+            _, labels, centers = cv2.kmeans(sample, n_colors, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+            labels = labels.ravel()
         
-        # Convert centers to integers
-        centers = np.uint8(centers)
+        # Order clusters by how many sampled pixels they hold
+        order = np.argsort(np.bincount(labels, minlength=n_colors))[::-1]
+        centers = np.clip(np.rint(centers[order]), 0, 255).astype(np.uint8)
         
-        return [tuple(color) for color in centers]
+        return [tuple(int(c) for c in color) for color in centers]
     
-    def calculate_brightness(self, image_path: str) -> float:
+    def calculate_brightness(self, gray: Union[str, np.ndarray]) -> float:
         """
         Calculate average brightness of the image.
         
         Args:
-            image_path: Path to the image file
+            gray: Path to the image file, a decoded BGR image, or its
+                grayscale version
             
         Returns:
             Average brightness value (0-255)
         """
-        image = self.load_image(image_path)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        return round(float(np.mean(gray)), 2)
+        return round(cv2.mean(self._as_gray(gray))[0], 2)
     
-    def detect_edges(self, image_path: str) -> int:
+    def detect_edges(self, gray: Union[str, np.ndarray]) -> int:
         """
         Detect number of edges in the image using Canny edge detection.
         
+        Always runs at full resolution: downscaling sharpens gradients
+        relative to the fixed Canny thresholds, so counts from a resized
+        image are not comparable.
+        
         Args:
-            image_path: Path to the image file
+            gray: Path to the image file, a decoded BGR image, or its
+                grayscale version
             
         Returns:
             Number of edge pixels detected
         """
-        image = self.load_image(image_path)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 100, 200)
-        return int(np.sum(edges > 0))
+        edges = cv2.Canny(self._as_gray(gray), 100, 200)
+        return int(cv2.countNonZero(edges))
     
-    def extract_all_features(self, image_path: str) -> Dict[str, Any]:
+    def extract_all_features(self, image_path: str,
+                             st: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """
         Extract all features from an image.
         
+        Results are cached per file and max_side, so calling this again on
+        an unchanged file returns the previously computed features. Results
+        where OCR failed are not cached, so the OCR is retried next time.
+        
+        Args:
+            image_path: Path to the image file
+            st: Result of os.stat for the file, if the caller already has it
+            
+        Returns:
+            Dictionary containing all extracted features
+        """
+        if st is None:
+            st = os.stat(image_path)
+        key = (os.path.abspath(image_path), st.st_mtime_ns, st.st_size, self.max_side)
+        features = _cache_get(key)
+        if features is None:
+            features = self._compute_features(image_path, st.st_size)
+            if not features['extracted_text'].startswith(_OCR_ERROR_PREFIX):
+                _cache_put(key, features)
+        features = dict(features)
+        features['image_path'] = image_path
+        return features
+    
+    def _compute_features(self, image_path: str, file_size: int) -> Dict[str, Any]:
+        """
+        Extract all features from an image without consulting the cache.
+        
+        The image is decoded once and the same array is shared by every
+        feature extractor. OCR runs on a background thread while the
+        OpenCV features are computed.
+        
         Args:
             image_path: Path to the image file
+            file_size: Size of the image file in bytes
             
         Returns:
             Dictionary containing all extracted features
@@ -147,22 +447,32 @@ class ImageProcessor:
         # Add file path
         features['image_path'] = image_path
         
-        # Extract text
-        features['extracted_text'] = self.extract_text(image_path)
+        # Decode once and derive the grayscale version once
+        image = self.load_image(image_path)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        
+        # Start text extraction; it waits on Tesseract, not the GIL. The
+        # decoded array has no alpha, so transparent images are OCR'd from
+        # the file where the alpha channel can be composited onto white.
+        ocr_input = image_path if self._has_alpha(image_path) else image
+        ocr_future = _ocr_pool().submit(self.extract_text, ocr_input)
         
         # Get image properties
-        properties = self.get_image_properties(image_path)
-        features.update(properties)
+        stats = self.get_image_properties(image, file_size=file_size)
         
         # Calculate brightness
-        features['avg_brightness'] = self.calculate_brightness(image_path)
+        stats['avg_brightness'] = self.calculate_brightness(gray)
         
         # Detect edges
-        features['edge_count'] = self.detect_edges(image_path)
+        stats['edge_count'] = self.detect_edges(gray)
         
         # Get dominant colors
-        dominant_colors = self.detect_dominant_colors(image_path, n_colors=3)
+        dominant_colors = self.detect_dominant_colors(image, n_colors=3)
         for i, color in enumerate(dominant_colors):
-            features[f'dominant_color_{i+1}'] = f"RGB{color}"
+            stats[f'dominant_color_{i+1}'] = f"RGB{color}"
+        
+        # Extract text
+        features['extracted_text'] = ocr_future.result()
+        features.update(stats)
         
         return features
@@ -4,12 +4,19 @@ Command-line interface for extracting features from images and exporting to Exce
 """
 
 import argparse
+import cv2
+import itertools
 import os
+import stat
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from image_processor import ImageProcessor
 from excel_exporter import ExcelExporter
 
 
+_VALID_EXTENSIONS = frozenset(('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif', '.webp'))
+
+
 def validate_image_file(file_path: str) -> bool:
     """
     Validate if the file is an image.
@@ -20,25 +27,169 @@ def validate_image_file(file_path: str) -> bool:
     Returns:
         True if file is a valid image, False otherwise
     """
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif', '.webp']
-    return os.path.splitext(file_path)[1].lower() in valid_extensions
+    return os.path.splitext(file_path)[1].lower() in _VALID_EXTENSIONS
+
+
+def _scan_images(directory_path: str, recursive: bool = False):
+    """
+    Find image files in a directory using os.scandir.
+    
+    Directory entries carry their file type, so only matching images need
+    a stat call. Files are yielded in the same order as os.walk would give.
+    
+    Args:
+        directory_path: Path to the directory to scan
+        recursive: Whether to descend into subdirectories
+        
+    Yields:
+        (file_path, os.stat result) for each image file
+    """
+    subdirectories = []
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if recursive and entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif validate_image_file(entry.name) and entry.is_file():
+                try:
+                    yield entry.path, entry.stat()
+                except OSError:
+                    continue
+    for subdirectory in subdirectories:
+        try:
+            yield from _scan_images(subdirectory, recursive)
+        except OSError:
+            continue
+
+
+_worker_processor = None
+
+# Number of images per worker task
+_CHUNK_SIZE = 4
+
+# Number of upcoming files each worker asks the OS to read ahead
+_PREFETCH_DEPTH = 2
+
+
+def _prefetch(file_path: str):
+    """
+    Ask the OS to start reading a file into the page cache.
+    
+    Args:
+        file_path: Path to the file
+    """
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _prefetched(paths: list, depth: int = _PREFETCH_DEPTH, lookahead: list = ()):
+    """
+    Yield paths in order while asking the OS to read ahead the next few.
+    
+    posix_fadvise only schedules the read and returns at once, so the
+    requests are made inline. The read-ahead window runs on into
+    lookahead, so the files that follow paths are already being read when
+    the last of paths is processed.
+    
+    Args:
+        paths: Paths to iterate over
+        depth: Number of upcoming files to prefetch
+        lookahead: Paths expected to be processed after paths; they are
+            prefetched but not yielded
+        
+    Yields:
+        Each path, once its prefetch request has been issued
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        yield from paths
+        return
+    
+    window = list(paths) + list(lookahead)
+    for path in window[:depth]:
+        _prefetch(path)
+    for i, path in enumerate(paths):
+        if i + depth < len(window):
+            _prefetch(window[i + depth])
+        yield path
+
+
+def _init_worker():
+    """
+    Limit each worker process to a single compute thread.
+    
+    Tesseract (through OpenMP) and OpenCV would otherwise each start a
+    thread per core in every worker. OMP_THREAD_LIMIT must be set before
+    any Tesseract engine starts; tesseract subprocesses inherit it too.
+    """
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    cv2.setNumThreads(1)
+
+
+def _extract_one(image_path: str, st: os.stat_result = None) -> tuple:
+    """
+    Extract features from one image inside a worker process.
+    
+    Each worker keeps a single ImageProcessor for all the images it handles.
+    
+    Args:
+        image_path: Path to the image file
+        st: Result of os.stat for the file, if already known
+        
+    Returns:
+        Tuple of (image_path, features or None, error message or None)
+    """
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = ImageProcessor()
+    try:
+        return image_path, _worker_processor.extract_all_features(image_path, st), None
+    except (FileNotFoundError, ValueError, OSError, IOError) as e:
+        return image_path, None, str(e)
+
+
+def _extract_chunk(items: list, lookahead: list = ()) -> list:
+    """
+    Extract features from a run of images inside a worker process.
+    
+    The next files are prefetched while the current one is processed,
+    including the first files of the run this worker is likely to take next.
+    
+    Args:
+        items: (image_path, stat result or None) pairs
+        lookahead: Paths of the images expected to follow this run
+        
+    Returns:
+        List of _extract_one results, in input order
+    """
+    image_paths = [image_path for image_path, _ in items]
+    stats = [st for _, st in items]
+    paths = _prefetched(image_paths, lookahead=lookahead)
+    return [_extract_one(image_path, st) for image_path, st in zip(paths, stats)]
 
 
-def process_single_image(image_path: str, output_path: str):
+def process_single_image(image_path: str, output_path: str, st: os.stat_result = None):
     """
     Process a single image and export to Excel.
     
     Args:
         image_path: Path to the image file
         output_path: Path for the output Excel file
+        st: Result of os.stat for the file, if already known
     """
     print(f"Processing image: {image_path}")
     
-    processor = ImageProcessor()
     exporter = ExcelExporter()
     
     try:
-        features = processor.extract_all_features(image_path)
+        with ImageProcessor() as processor:
+            features = processor.extract_all_features(image_path, st)
         exporter.export_single_image(features, output_path)
         print("Processing completed successfully!")
     except (FileNotFoundError, ValueError, OSError, IOError) as e:
@@ -46,7 +197,8 @@ def process_single_image(image_path: str, output_path: str):
         sys.exit(1)
 
 
-def process_multiple_images(image_paths: list, output_path: str, with_summary: bool = False):
+def process_multiple_images(image_paths: list, output_path: str, with_summary: bool = False,
+                            stats: list = None):
     """
     Process multiple images and export to Excel.
     
@@ -54,22 +206,36 @@ def process_multiple_images(image_paths: list, output_path: str, with_summary: b
         image_paths: List of paths to image files
         output_path: Path for the output Excel file
         with_summary: Whether to include a summary sheet
+        stats: os.stat results matching image_paths (entries may be None),
+            so the files are not stat'ed again
     """
     print(f"Processing {len(image_paths)} images...")
     
-    processor = ImageProcessor()
     exporter = ExcelExporter()
     
     features_list = []
     
-    for i, image_path in enumerate(image_paths, 1):
-        print(f"  [{i}/{len(image_paths)}] Processing: {image_path}")
-        try:
-            features = processor.extract_all_features(image_path)
+    # Images are independent, so extract them in parallel across processes
+    max_workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        items = list(zip(image_paths, stats or [None] * len(image_paths)))
+        chunks = [items[i:i + _CHUNK_SIZE] for i in range(0, len(items), _CHUNK_SIZE)]
+        
+        # Runs are handed out in order, so when a worker finishes run i the
+        # next one waiting is about max_workers further on; prefetch its
+        # first files so read-ahead carries over between runs
+        lookaheads = [
+            [image_path for image_path, _ in chunks[i + max_workers][:_PREFETCH_DEPTH]]
+            if i + max_workers < len(chunks) else []
+            for i in range(len(chunks))
+        ]
+        results = itertools.chain.from_iterable(executor.map(_extract_chunk, chunks, lookaheads))
+        for i, (image_path, features, error) in enumerate(results, 1):
+            print(f"  [{i}/{len(image_paths)}] Processed: {image_path}")
+            if error is not None:
+                print(f"  Warning: Error processing {image_path}: {error}")
+                continue
             features_list.append(features)
-        except (FileNotFoundError, ValueError, OSError, IOError) as e:
-            print(f"  Warning: Error processing {image_path}: {str(e)}")
-            continue
     
     if not features_list:
         print("Error: No images were successfully processed")
@@ -97,24 +263,17 @@ def process_directory(directory_path: str, output_path: str, recursive: bool = F
         with_summary: Whether to include a summary sheet
     """
     image_files = []
+    image_stats = []
     
-    if recursive:
-        for root, _, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if validate_image_file(file_path):
-                    image_files.append(file_path)
-    else:
-        for file in os.listdir(directory_path):
-            file_path = os.path.join(directory_path, file)
-            if os.path.isfile(file_path) and validate_image_file(file_path):
-                image_files.append(file_path)
+    for file_path, st in _scan_images(directory_path, recursive):
+        image_files.append(file_path)
+        image_stats.append(st)
     
     if not image_files:
         print(f"No image files found in {directory_path}")
         sys.exit(1)
     
-    process_multiple_images(image_files, output_path, with_summary)
+    process_multiple_images(image_files, output_path, with_summary, image_stats)
 
 
 def main():
@@ -161,9 +320,12 @@ Examples:
     
     # Process based on input type
     if args.image:
-        # Validate input files
+        # Validate input files, keeping one stat result per file
+        image_stats = []
         for image_path in args.image:
-            if not os.path.exists(image_path):
+            try:
+                image_stats.append(os.stat(image_path))
+            except OSError:
                 print(f"Error: File not found: {image_path}")
                 sys.exit(1)
             if not validate_image_file(image_path):
@@ -171,15 +333,17 @@ Examples:
                 sys.exit(1)
         
         if len(args.image) == 1:
-            process_single_image(args.image[0], args.output)
+            process_single_image(args.image[0], args.output, image_stats[0])
         else:
-            process_multiple_images(args.image, args.output, args.summary)
+            process_multiple_images(args.image, args.output, args.summary, image_stats)
     
     elif args.directory:
-        if not os.path.exists(args.directory):
+        try:
+            directory_stat = os.stat(args.directory)
+        except OSError:
             print(f"Error: Directory not found: {args.directory}")
             sys.exit(1)
-        if not os.path.isdir(args.directory):
+        if not stat.S_ISDIR(directory_stat.st_mode):
             print(f"Error: Not a directory: {args.directory}")
             sys.exit(1)
         
@@ -0,0 +1,50 @@
+"""
+Tests for the command-line processing functions in main.py.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+pytest.importorskip("openpyxl")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_process_multiple_images_after_ocr_in_parent(tmp_path):
+    """Worker processes must not inherit the parent's OCR thread pool."""
+    paths = []
+    for name in ("a.png", "b.png", "c.png"):
+        image = np.zeros((32, 32, 3), np.uint8)
+        image[:16] = (255, 255, 255)
+        path = tmp_path / name
+        cv2.imwrite(str(path), image)
+        paths.append(str(path))
+    output_path = tmp_path / "out.xlsx"
+
+    # Run in a fresh interpreter and its own session so a deadlock fails the
+    # test, and any stuck pool workers can be killed with it
+    script = textwrap.dedent(f"""
+        import main
+        from image_processor import ImageProcessor
+        ImageProcessor().extract_all_features({paths[0]!r})
+        main.process_multiple_images({paths[1:]!r}, {str(output_path)!r})
+    """)
+    process = subprocess.Popen([sys.executable, "-c", script], cwd=REPO_ROOT,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, start_new_session=True)
+    try:
+        output, _ = process.communicate(timeout=60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        pytest.fail("process_multiple_images hung after OCR ran in the parent")
+
+    assert process.returncode == 0, output
+    assert output_path.exists()